@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Punto de entrada liviano para invocaciones de una sola operación (cron, batch)
+
+Lee solo los registros necesarios mediante el índice id -> offset de la instantánea
+y registra las mutaciones en la bitácora de escritura anticipada, sin reescribir
+el archivo completo. Las invocaciones concurrentes sobre el mismo archivo se serializan
+con el bloqueo de la bitácora.
+
+Uso:
+    python3 cli_bancario.py <archivo> registrar-cliente <nombre> <email> <telefono> <ingresos> <score>
+    python3 cli_bancario.py <archivo> solicitar <id_cliente> <tipo> <monto> <plazo_meses>
+    python3 cli_bancario.py <archivo> aprobar <id_prestamo>
+    python3 cli_bancario.py <archivo> rechazar <id_prestamo>
+    python3 cli_bancario.py <archivo> desembolsar <id_prestamo>
+    python3 cli_bancario.py <archivo> pagar <id_prestamo> <monto> [fecha_iso]
+    python3 cli_bancario.py <archivo> estado <id_prestamo>
+    python3 cli_bancario.py <archivo> moras
+    python3 cli_bancario.py <archivo> compactar
+"""
+from contextlib import contextmanager
+import math
+import sys
+
+# Los módulos pesados (core_bancario, datetime) se importan dentro de cada
+# comando para que el arranque del intérprete no pague por lo que no se usa
+
+# Registros acumulados en la bitácora a partir de los cuales se compacta al abrir,
+# para que leerla no termine costando más que la operación misma
+LIMITE_BITACORA = 10000
+
+
+@contextmanager
+def abrir_core(archivo: str, ids=None, tipos: str = "cp", compactar: bool = False):
+    from core_bancario import CoreBancario, BitacoraEscritura, PoliticaSincronizacion
+
+    # La bitácora queda bloqueada para otros procesos hasta cerrarla
+    bitacora = BitacoraEscritura(archivo + ".wal", PoliticaSincronizacion.POR_OPERACION)
+    try:
+        core = CoreBancario(bitacora)
+        if compactar or bitacora.registros > LIMITE_BITACORA or not core.cargar_registros(archivo, ids, tipos):
+            # Índice ausente o desactualizado, o bitácora larga: carga completa y punto de control.
+            # Si la instantánea no se puede leer, se lanza ValueError sin tocar ningún archivo
+            core.cargar_datos(archivo, estricto=True)
+            core.guardar_datos(archivo)
+        yield core
+    finally:
+        bitacora.cerrar()
+
+
+def registrar_cliente(archivo, nombre, email, telefono, ingresos, score):
+    with abrir_core(archivo, set()) as core:
+        print(core.registrar_cliente(nombre, email, telefono, ingresos, score))
+    return 0
+
+
+def solicitar(archivo, id_cliente, tipo, monto, plazo_meses):
+    with abrir_core(archivo, {id_cliente}, "c") as core:
+        id_prestamo = core.solicitar_prestamo(id_cliente, tipo, monto, plazo_meses)
+    if id_prestamo is None:
+        print("Solicitud rechazada")
+        return 1
+    print(id_prestamo)
+    return 0
+
+
+def _transicion(metodo):
+    def comando(archivo, id_prestamo):
+        with abrir_core(archivo, {id_prestamo}, "p") as core:
+            resultado = getattr(core, metodo)(id_prestamo)
+        print(core.obtener_estado_prestamo(id_prestamo).value if resultado else "Operación no permitida")
+        return 0 if resultado else 1
+    return comando
+
+
+def pagar(archivo, id_prestamo, monto, fecha_pago=None):
+    from datetime import datetime
+
+    with abrir_core(archivo, {id_prestamo}, "p") as core:
+        resultado = core.registrar_pago(id_prestamo, monto, fecha_pago or datetime.now())
+    if not resultado:
+        print("No se pudo registrar el pago")
+        return 1
+    prestamo = core.prestamos[id_prestamo]
+    print(f"{prestamo.estado.value} {prestamo.saldo:.2f}")
+    return 0
+
+
+def estado(archivo, id_prestamo):
+    with abrir_core(archivo, {id_prestamo}, "p") as core:
+        pass
+    if id_prestamo not in core.prestamos:
+        print("No encontrado")
+        return 1
+    prestamo = core.prestamos[id_prestamo]
+    print(f"{prestamo.estado.value} {prestamo.saldo:.2f}")
+    return 0
+
+
+def moras(archivo):
+    # El barrido recorre todos los préstamos pero no construye clientes
+    with abrir_core(archivo, tipos="p") as core:
+        lsn = core.bitacora.lsn
+        core.verificar_moras()
+        print(core.bitacora.lsn - lsn)
+    return 0
+
+
+def compactar(archivo):
+    # Punto de control: incorpora la bitácora a la instantánea y regenera el índice
+    with abrir_core(archivo, compactar=True):
+        pass
+    return 0
+
+
+def _numero(valor: str) -> float:
+    numero = float(valor)
+    if not math.isfinite(numero):
+        raise ValueError(f"número no finito: {valor}")
+    return numero
+
+
+def _tipo_prestamo(valor: str):
+    from core_bancario import TipoPrestamo
+    return TipoPrestamo(valor.upper())
+
+
+def _fecha(valor: str):
+    from datetime import datetime
+    return datetime.fromisoformat(valor)
+
+
+# comando -> (función, conversores de argumentos, cantidad de argumentos opcionales al final)
+COMANDOS = {
+    "registrar-cliente": (registrar_cliente, (str, str, str, _numero, int), 0),
+    "solicitar": (solicitar, (str, _tipo_prestamo, _numero, int), 0),
+    "aprobar": (_transicion("aprobar_prestamo"), (str,), 0),
+    "rechazar": (_transicion("rechazar_prestamo"), (str,), 0),
+    "desembolsar": (_transicion("desembolsar_prestamo"), (str,), 0),
+    "pagar": (pagar, (str, _numero, _fecha), 1),
+    "estado": (estado, (str,), 0),
+    "moras": (moras, (), 0),
+    "compactar": (compactar, (), 0),
+}
+
+
+def _uso() -> int:
+    print(__doc__.split("Uso:")[1].rstrip(), file=sys.stderr)
+    return 2
+
+
+def main(argv=None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) < 2 or argv[1] not in COMANDOS:
+        return _uso()
+
+    archivo, nombre, argumentos = argv[0], argv[1], argv[2:]
+    comando, conversores, opcionales = COMANDOS[nombre]
+    if not len(conversores) - opcionales <= len(argumentos) <= len(conversores):
+        print(f"Cantidad de argumentos inválida para '{nombre}'", file=sys.stderr)
+        return _uso()
+    try:
+        valores = [convertir(valor) for convertir, valor in zip(conversores, argumentos)]
+    except ValueError as e:
+        print(f"Argumento inválido para '{nombre}': {e}", file=sys.stderr)
+        return _uso()
+
+    try:
+        return comando(archivo, *valores)
+    except ValueError as e:
+        # Instantánea ilegible o bitácora inconsistente: no se modificó ningún archivo
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
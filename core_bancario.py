@@ -5,8 +5,22 @@ Sistema de gestión de préstamos para instituciones financieras
 from datetime import datetime, timedelta
 from enum import Enum
 import json
-from typing import List, Dict, Optional
+import os
+import struct
+import threading
+import time
+from typing import List, Dict, Optional, Iterator
 import uuid
+import zlib
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+try:
+    import msvcrt
+except ImportError:  # POSIX
+    msvcrt = None
 
 
 class EstadoPrestamo(Enum):
@@ -145,13 +159,16 @@ class Prestamo:
         
         id_pago = str(uuid.uuid4())
         pago = Pago(id_pago, self.id_prestamo, monto, fecha_pago)
+        self.aplicar_pago(pago)
+        return True
+    
+    def aplicar_pago(self, pago: Pago):
+        # Aplica un pago ya validado (usado también al reproducir la bitácora)
         self.pagos.append(pago)
-        self.saldo -= monto
+        self.saldo -= pago.monto
         
         if self.saldo <= 0:
             self.estado = EstadoPrestamo.PAGADO
-        
-        return True
     
     def verificar_mora(self):
         if self.estado == EstadoPrestamo.DESEMBOLSADO and self.pagos:
@@ -196,17 +213,362 @@ class Prestamo:
         return prestamo
 
 
+def _sincronizar_directorio(archivo: str):
+    # En Windows no se puede abrir un directorio; NTFS registra el renombrado en su diario
+    if os.name == "nt":
+        return
+    fd = os.open(os.path.dirname(os.path.abspath(archivo)), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _bloquear_archivo(archivo):
+    # Bloqueo exclusivo entre procesos; espera hasta obtenerlo y nunca continúa sin él
+    if fcntl is not None:
+        fcntl.flock(archivo.fileno(), fcntl.LOCK_EX)
+    elif msvcrt is not None:
+        archivo.seek(0)
+        while True:
+            try:
+                # LK_LOCK reintenta durante unos 10 segundos antes de fallar
+                msvcrt.locking(archivo.fileno(), msvcrt.LK_LOCK, 1)
+                return
+            except OSError:
+                continue
+    else:
+        raise OSError("No hay bloqueo de archivos disponible en esta plataforma")
+
+
+def _desbloquear_archivo(archivo):
+    if fcntl is not None:
+        fcntl.flock(archivo.fileno(), fcntl.LOCK_UN)
+    else:
+        archivo.seek(0)
+        msvcrt.locking(archivo.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class PoliticaSincronizacion(Enum):
+    POR_OPERACION = "POR_OPERACION"  # fsync después de cada operación
+    GRUPO = "GRUPO"                  # cada operación espera un fsync compartido con las concurrentes
+    SISTEMA = "SISTEMA"              # escritura al buffer del sistema operativo, sin fsync (puede perder datos)
+
+
+class BitacoraEscritura:
+    """
+    Bitácora de escritura anticipada (write-ahead log) para las mutaciones de CoreBancario.
+
+    Cada operación se agrega como una línea "<crc32> <json>\\n" con un número de
+    secuencia (lsn) creciente. Una línea incompleta o corrupta al final del archivo
+    (caída a mitad de escritura) se descarta al abrir la bitácora.
+
+    Con la política GRUPO, registrar no retorna hasta que un fsync cubre su lsn: el primer
+    hilo que espera hace de líder y un solo fsync confirma todo el lote acumulado mientras
+    tanto. intervalo_ms es la espera opcional del líder para juntar un lote más grande.
+
+    La bitácora toma un bloqueo exclusivo sobre "<archivo>.lock" (flock en POSIX,
+    msvcrt.locking en Windows) desde que se abre hasta cerrar(), así que procesos que
+    comparten el mismo archivo se ejecutan de a uno. Se usa un archivo aparte porque en
+    Windows el bloqueo es obligatorio e impediría leer la propia bitácora.
+    """
+
+    def __init__(self, archivo: str,
+                 politica: PoliticaSincronizacion = PoliticaSincronizacion.GRUPO,
+                 intervalo_ms: float = 0.0):
+        self.archivo = archivo
+        self.politica = politica
+        self.intervalo_ms = intervalo_ms
+        self.lsn = 0
+        self._condicion = threading.Condition()
+        self._lsn_durable = 0
+        self._sincronizando = False
+        self.registros = 0
+
+        # El lsn y el truncado de la cola solo son válidos mientras nadie más escribe
+        self._bloqueo = open(archivo + ".lock", 'a+b')
+        try:
+            _bloquear_archivo(self._bloqueo)
+        except OSError:
+            self._bloqueo.close()
+            raise
+        self._archivo = open(archivo, 'ab')
+
+        fin_valido = 0
+        for registro, fin in self._leer_con_offsets(archivo):
+            self.lsn = registro["lsn"]
+            self.registros += 1
+            fin_valido = fin
+        self._lsn_durable = self.lsn
+
+        self._archivo.seek(0, os.SEEK_END)
+        if self._archivo.tell() != fin_valido:
+            # Descartar la cola incompleta que dejó una caída
+            self._archivo.truncate(fin_valido)
+            os.fsync(self._archivo.fileno())
+
+    @staticmethod
+    def _leer_con_offsets(archivo: str) -> Iterator:
+        try:
+            f = open(archivo, 'rb')
+        except FileNotFoundError:
+            return
+        with f:
+            fin = 0
+            for linea in f:
+                if not linea.endswith(b"\n"):
+                    return
+                crc, _, contenido = linea[:-1].partition(b" ")
+                try:
+                    if int(crc, 16) != zlib.crc32(contenido):
+                        return
+                    registro = json.loads(contenido)
+                except ValueError:
+                    return
+                fin += len(linea)
+                yield registro, fin
+
+    @classmethod
+    def leer(cls, archivo: str) -> Iterator[Dict]:
+        for registro, _ in cls._leer_con_offsets(archivo):
+            yield registro
+
+    @staticmethod
+    def destino(registro: Dict):
+        # Devuelve (tipo, id) del registro afectado: "c" cliente o "p" préstamo
+        operacion = registro["op"]
+        if operacion == "cliente":
+            return "c", registro["cliente"]["id_cliente"]
+        if operacion == "prestamo":
+            return "p", registro["prestamo"]["id_prestamo"]
+        if operacion == "pago":
+            return "p", registro["pago"]["id_prestamo"]
+        return "p", registro["id_prestamo"]
+
+    def registrar(self, operacion: str, **datos) -> int:
+        lsn = self.agregar(operacion, **datos)
+        self.esperar(lsn)
+        return lsn
+
+    def agregar(self, operacion: str, **datos) -> int:
+        # Escribe el registro y le asigna lsn; con GRUPO todavía no es durable (ver esperar)
+        with self._condicion:
+            self.lsn += 1
+            self.registros += 1
+            lsn = self.lsn
+            datos["lsn"] = lsn
+            datos["op"] = operacion
+            contenido = json.dumps(datos, separators=(",", ":")).encode()
+            self._archivo.write(b"%08x %s\n" % (zlib.crc32(contenido), contenido))
+
+            if self.politica == PoliticaSincronizacion.POR_OPERACION:
+                self._archivo.flush()
+                os.fsync(self._archivo.fileno())
+                self._lsn_durable = lsn
+            elif self.politica == PoliticaSincronizacion.SISTEMA:
+                self._archivo.flush()
+            return lsn
+
+    def esperar(self, lsn: int):
+        # Con GRUPO bloquea hasta que un fsync cubra el lsn; las demás políticas ya retornaron durables
+        if self.politica == PoliticaSincronizacion.GRUPO:
+            with self._condicion:
+                self._esperar_durabilidad(lsn)
+
+    def _esperar_durabilidad(self, lsn: int):
+        # Se llama con self._condicion tomada; la libera mientras espera o hace fsync
+        while self._lsn_durable < lsn:
+            if self._sincronizando:
+                self._condicion.wait()
+                continue
+
+            self._sincronizando = True
+            try:
+                if self.intervalo_ms > 0:
+                    self._condicion.release()
+                    try:
+                        time.sleep(self.intervalo_ms / 1000)
+                    finally:
+                        self._condicion.acquire()
+                objetivo = self.lsn
+                self._archivo.flush()
+                self._condicion.release()
+                try:
+                    os.fsync(self._archivo.fileno())
+                finally:
+                    self._condicion.acquire()
+                self._lsn_durable = max(self._lsn_durable, objetivo)
+            finally:
+                self._sincronizando = False
+                self._condicion.notify_all()
+
+    def sincronizar(self):
+        with self._condicion:
+            self._esperar_durabilidad(self.lsn)
+
+    def truncar(self):
+        # Tras un punto de control la bitácora queda vacía; el lsn no se reinicia
+        with self._condicion:
+            self._archivo.flush()
+            self._archivo.truncate(0)
+            os.fsync(self._archivo.fileno())
+            self._lsn_durable = self.lsn
+            self.registros = 0
+
+    def cerrar(self):
+        if not self._archivo.closed:
+            with self._condicion:
+                self._archivo.flush()
+                os.fsync(self._archivo.fileno())
+                self._lsn_durable = self.lsn
+                self._archivo.close()
+                _desbloquear_archivo(self._bloqueo)
+                self._bloqueo.close()
+
+
+class IndiceRegistros:
+    """
+    Índice en disco id -> (tipo, offset, longitud) de cada registro de una instantánea.
+
+    Las entradas tienen ancho fijo y están ordenadas por id, de modo que una búsqueda
+    es binaria sobre el archivo y no requiere leer el índice ni la instantánea completos.
+    La cabecera guarda la generación de la instantánea para detectar índices desactualizados.
+    """
+    MAGICO = b"BCIDX1"
+    _CABECERA = struct.Struct("<6sHIQ32s")  # mágico, ancho, cantidad, lsn, generación
+
+    def __init__(self, archivo_indice: str):
+        self._archivo = open(archivo_indice, 'rb')
+        magico, self.ancho, self.cantidad, self.lsn, generacion = \
+            self._CABECERA.unpack(self._archivo.read(self._CABECERA.size))
+        if magico != self.MAGICO:
+            self._archivo.close()
+            raise ValueError("Índice inválido: " + archivo_indice)
+        self.generacion = generacion.decode()
+        self._entrada = struct.Struct("<%dscQI" % self.ancho)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self._archivo.close()
+
+    @classmethod
+    def escribir(cls, archivo: str, entradas: List, generacion: str, lsn: int = 0):
+        claves = sorted((id.encode(), tipo.encode(), offset, longitud)
+                        for id, tipo, offset, longitud in entradas)
+        ancho = max((len(clave[0]) for clave in claves), default=1)
+        entrada = struct.Struct("<%dscQI" % ancho)
+
+        temporal = archivo + ".idx.tmp"
+        with open(temporal, 'wb') as f:
+            f.write(cls._CABECERA.pack(cls.MAGICO, ancho, len(claves), lsn, generacion.encode()))
+            f.write(b"".join(entrada.pack(*clave) for clave in claves))
+        os.replace(temporal, archivo + ".idx")
+
+    @classmethod
+    def abrir(cls, archivo: str) -> Optional["IndiceRegistros"]:
+        # Devuelve None si el índice falta o no corresponde a la instantánea actual
+        try:
+            indice = cls(archivo + ".idx")
+        except (OSError, ValueError, struct.error):
+            return None
+        try:
+            with open(archivo, 'rb') as f:
+                cabecera = f.readline().rstrip().rstrip(b",")
+            generacion = json.loads(cabecera + b"}").get("generacion")
+        except (OSError, ValueError):
+            generacion = None
+        if generacion != indice.generacion:
+            indice._archivo.close()
+            return None
+        return indice
+
+    def _leer(self, posicion: int):
+        self._archivo.seek(self._CABECERA.size + posicion * self._entrada.size)
+        clave, tipo, offset, longitud = self._entrada.unpack(self._archivo.read(self._entrada.size))
+        return clave.rstrip(b"\0"), tipo.decode(), offset, longitud
+
+    def buscar(self, id: str):
+        clave = id.encode()
+        if len(clave) > self.ancho:
+            return None
+        inicio, fin = 0, self.cantidad
+        while inicio < fin:
+            medio = (inicio + fin) // 2
+            actual, tipo, offset, longitud = self._leer(medio)
+            if actual == clave:
+                return id, tipo, offset, longitud
+            if actual < clave:
+                inicio = medio + 1
+            else:
+                fin = medio
+        return None
+
+    def buscar_varios(self, ids) -> List:
+        return [entrada for entrada in map(self.buscar, ids) if entrada is not None]
+
+    def entradas(self) -> Iterator:
+        self._archivo.seek(self._CABECERA.size)
+        datos = self._archivo.read(self.cantidad * self._entrada.size)
+        for clave, tipo, offset, longitud in self._entrada.iter_unpack(datos):
+            yield clave.rstrip(b"\0").decode(), tipo.decode(), offset, longitud
+
+
 class CoreBancario:
-    def __init__(self):
+    def __init__(self, bitacora: Optional[BitacoraEscritura] = None):
         self.clientes: Dict[str, Cliente] = {}
         self.prestamos: Dict[str, Prestamo] = {}
         self.pagos: Dict[str, Pago] = {}
-    
-    def registrar_cliente(self, nombre: str, email: str, telefono: str, 
+        self.bitacora = bitacora
+        # Valida, modifica y agrega a la bitácora como una sola unidad, para que dos hilos
+        # no validen contra el mismo saldo y el orden de la bitácora sea el de la memoria
+        self._lock = threading.RLock()
+        # Motivo por el que guardar_datos sobrescribiría la instantánea con un estado incompleto
+        self._guardado_bloqueado: Optional[str] = None
+
+    def _registrar_en_bitacora(self, operacion: str, **datos) -> int:
+        # Se llama con self._lock tomado; la espera de durabilidad va en _confirmar, fuera del lock
+        if self.bitacora is None:
+            return 0
+        return self.bitacora.agregar(operacion, **datos)
+
+    def _confirmar(self, lsn: int):
+        if self.bitacora is not None and lsn:
+            self.bitacora.esperar(lsn)
+
+    def _aplicar_registro(self, registro: Dict):
+        operacion = registro["op"]
+        if operacion == "cliente":
+            cliente = Cliente.from_dict(registro["cliente"])
+            self.clientes[cliente.id_cliente] = cliente
+        elif operacion == "prestamo":
+            prestamo = Prestamo.from_dict(registro["prestamo"])
+            self.prestamos[prestamo.id_prestamo] = prestamo
+        elif operacion == "aprobar":
+            prestamo = self.prestamos[registro["id_prestamo"]]
+            prestamo.estado = EstadoPrestamo.APROBADO
+            prestamo.fecha_aprobacion = datetime.fromisoformat(registro["fecha"])
+        elif operacion == "rechazar":
+            self.prestamos[registro["id_prestamo"]].estado = EstadoPrestamo.RECHAZADO
+        elif operacion == "desembolsar":
+            prestamo = self.prestamos[registro["id_prestamo"]]
+            prestamo.estado = EstadoPrestamo.DESEMBOLSADO
+            prestamo.fecha_desembolso = datetime.fromisoformat(registro["fecha"])
+        elif operacion == "pago":
+            pago = Pago.from_dict(registro["pago"])
+            self.prestamos[pago.id_prestamo].aplicar_pago(pago)
+        elif operacion == "mora":
+            self.prestamos[registro["id_prestamo"]].estado = EstadoPrestamo.EN_MORA
+
+    def registrar_cliente(self, nombre: str, email: str, telefono: str,
                          ingresos_mensuales: float, score_crediticio: int) -> str:
         id_cliente = str(uuid.uuid4())
         cliente = Cliente(id_cliente, nombre, email, telefono, ingresos_mensuales, score_crediticio)
-        self.clientes[id_cliente] = cliente
+        with self._lock:
+            self.clientes[id_cliente] = cliente
+            lsn = self._registrar_en_bitacora("cliente", cliente=cliente.to_dict())
+        self._confirmar(lsn)
         return id_cliente
     
     def solicitar_prestamo(self, id_cliente: str, tipo: TipoPrestamo, monto: float, 
@@ -237,37 +599,62 @@ class CoreBancario:
         
         id_prestamo = str(uuid.uuid4())
         prestamo = Prestamo(id_prestamo, id_cliente, tipo, monto, tasa_interes, plazo_meses)
-        self.prestamos[id_prestamo] = prestamo
+        with self._lock:
+            self.prestamos[id_prestamo] = prestamo
+            lsn = self._registrar_en_bitacora("prestamo", prestamo=prestamo.to_dict())
+        self._confirmar(lsn)
         
         return id_prestamo
     
     def aprobar_prestamo(self, id_prestamo: str) -> bool:
-        if id_prestamo not in self.prestamos:
-            return False
-        
-        prestamo = self.prestamos[id_prestamo]
-        return prestamo.aprobar()
+        with self._lock:
+            if id_prestamo not in self.prestamos:
+                return False
+            
+            prestamo = self.prestamos[id_prestamo]
+            if not prestamo.aprobar():
+                return False
+            lsn = self._registrar_en_bitacora("aprobar", id_prestamo=id_prestamo,
+                                              fecha=prestamo.fecha_aprobacion.isoformat())
+        self._confirmar(lsn)
+        return True
     
     def rechazar_prestamo(self, id_prestamo: str) -> bool:
-        if id_prestamo not in self.prestamos:
-            return False
-        
-        prestamo = self.prestamos[id_prestamo]
-        return prestamo.rechazar()
+        with self._lock:
+            if id_prestamo not in self.prestamos:
+                return False
+            
+            prestamo = self.prestamos[id_prestamo]
+            if not prestamo.rechazar():
+                return False
+            lsn = self._registrar_en_bitacora("rechazar", id_prestamo=id_prestamo)
+        self._confirmar(lsn)
+        return True
     
     def desembolsar_prestamo(self, id_prestamo: str) -> bool:
-        if id_prestamo not in self.prestamos:
-            return False
-        
-        prestamo = self.prestamos[id_prestamo]
-        return prestamo.desembolsar()
+        with self._lock:
+            if id_prestamo not in self.prestamos:
+                return False
+            
+            prestamo = self.prestamos[id_prestamo]
+            if not prestamo.desembolsar():
+                return False
+            lsn = self._registrar_en_bitacora("desembolsar", id_prestamo=id_prestamo,
+                                              fecha=prestamo.fecha_desembolso.isoformat())
+        self._confirmar(lsn)
+        return True
     
     def registrar_pago(self, id_prestamo: str, monto: float, fecha_pago: datetime) -> bool:
-        if id_prestamo not in self.prestamos:
-            return False
-        
-        prestamo = self.prestamos[id_prestamo]
-        return prestamo.registrar_pago(monto, fecha_pago)
+        with self._lock:
+            if id_prestamo not in self.prestamos:
+                return False
+            
+            prestamo = self.prestamos[id_prestamo]
+            if not prestamo.registrar_pago(monto, fecha_pago):
+                return False
+            lsn = self._registrar_en_bitacora("pago", pago=prestamo.pagos[-1].to_dict())
+        self._confirmar(lsn)
+        return True
     
     def obtener_estado_prestamo(self, id_prestamo: str) -> Optional[EstadoPrestamo]:
         if id_prestamo not in self.prestamos:
@@ -282,29 +669,139 @@ class CoreBancario:
         return [prestamo for prestamo in self.prestamos.values() if prestamo.estado == estado]
     
     def verificar_moras(self):
-        for prestamo in self.prestamos.values():
-            prestamo.verificar_mora()
+        lsn = 0
+        with self._lock:
+            for prestamo in self.prestamos.values():
+                if prestamo.estado == EstadoPrestamo.DESEMBOLSADO:
+                    prestamo.verificar_mora()
+                    if prestamo.estado == EstadoPrestamo.EN_MORA:
+                        lsn = self._registrar_en_bitacora("mora", id_prestamo=prestamo.id_prestamo)
+        # Un solo fsync cubre todas las moras del barrido
+        self._confirmar(lsn)
     
     def guardar_datos(self, archivo: str):
-        datos = {
-            "clientes": {id: cliente.to_dict() for id, cliente in self.clientes.items()},
-            "prestamos": {id: prestamo.to_dict() for id, prestamo in self.prestamos.items()}
-        }
+        if self._guardado_bloqueado is not None:
+            raise ValueError(f"No se puede guardar en {archivo}: {self._guardado_bloqueado}")
+        with self._lock:
+            # Cada registro se escribe como JSON compacto en su propia línea para poder
+            # indexar su posición; el archivo sigue siendo JSON válido para cargar_datos
+            generacion = uuid.uuid4().hex
+            lsn = self.bitacora.lsn if self.bitacora is not None else 0
+            entradas = []
         
-        with open(archivo, 'w') as f:
-            json.dump(datos, f, indent=2)
-    
-    def cargar_datos(self, archivo: str):
+            # Escritura atómica: una caída nunca deja una instantánea a medias
+            temporal = archivo + ".tmp"
+            with open(temporal, 'wb') as f:
+                f.write(b'{"generacion": "%s",\n' % generacion.encode())
+                if self.bitacora is not None:
+                    f.write(b'"lsn": %d,\n' % lsn)
+                secciones = (("clientes", "c", self.clientes), ("prestamos", "p", self.prestamos))
+                for numero, (seccion, tipo, registros) in enumerate(secciones):
+                    f.write(b'"%s": {' % seccion.encode())
+                    separador = b"\n"
+                    for id, registro in registros.items():
+                        f.write(separador + json.dumps(id).encode() + b": ")
+                        contenido = json.dumps(registro.to_dict()).encode()
+                        entradas.append((id, tipo, f.tell(), len(contenido)))
+                        f.write(contenido)
+                        separador = b",\n"
+                    f.write(b"\n},\n" if numero < len(secciones) - 1 else b"\n}\n}\n")
+                if self.bitacora is not None:
+                    f.flush()
+                    os.fsync(f.fileno())
+            os.replace(temporal, archivo)
+            if self.bitacora is not None:
+                # El renombrado debe ser durable antes de vaciar la bitácora
+                _sincronizar_directorio(archivo)
+            IndiceRegistros.escribir(archivo, entradas, generacion, lsn)
+        
+            # Punto de control: la instantánea ya contiene todo lo registrado en la bitácora
+            if self.bitacora is not None:
+                self.bitacora.truncar()
+    
+    def cargar_datos(self, archivo: str, estricto: bool = False) -> bool:
+        # Con estricto=True no se imprime nada y un archivo ilegible lanza ValueError.
+        # Con bitácora siempre se lanza: seguir con un core vacío permitiría que guardar_datos
+        # sobrescribiera la instantánea y vaciara la bitácora que protege esos datos
+        lsn_instantanea = 0
         try:
             with open(archivo, 'r') as f:
                 datos = json.load(f)
             
             self.clientes = {id: Cliente.from_dict(cliente_data) for id, cliente_data in datos["clientes"].items()}
             self.prestamos = {id: Prestamo.from_dict(prestamo_data) for id, prestamo_data in datos["prestamos"].items()}
+            lsn_instantanea = datos.get("lsn", 0)
         except FileNotFoundError:
-            print("Archivo no encontrado. Iniciando con datos vacíos.")
+            if not estricto:
+                print("Archivo no encontrado. Iniciando con datos vacíos.")
         except Exception as e:
+            # Sin la instantánea la bitácora no tiene sobre qué reproducirse
+            if estricto or self.bitacora is not None:
+                self._guardado_bloqueado = f"la carga de {archivo} falló"
+                raise ValueError(f"Error al cargar datos de {archivo}: {e}") from e
             print(f"Error al cargar datos: {e}")
+            return False
+        
+        if self.bitacora is not None:
+            try:
+                self.recuperar(lsn_instantanea)
+            except ValueError:
+                self.clientes = {}
+                self.prestamos = {}
+                self._guardado_bloqueado = f"la bitácora no corresponde a {archivo}"
+                raise
+        self._guardado_bloqueado = None
+        return True
+    
+    def cargar_registros(self, archivo: str, ids: Optional[set] = None, tipos: str = "cp") -> bool:
+        """
+        Carga solo los registros indicados usando el índice de la instantánea.
+        Con ids=None carga todos los registros de los tipos pedidos ("c" clientes, "p" préstamos).
+        Devuelve False si el índice no existe o no corresponde a la instantánea.
+        Tras una carga parcial guardar_datos queda bloqueado: escribiría una instantánea
+        con solo estos registros y vaciaría la bitácora.
+        """
+        indice = IndiceRegistros.abrir(archivo)
+        if indice is None:
+            return False
+        if ids is not None or set(tipos) != {"c", "p"}:
+            self._guardado_bloqueado = "el core se cargó parcialmente con cargar_registros"
+        
+        with indice, open(archivo, 'rb') as f:
+            entradas = indice.entradas() if ids is None else indice.buscar_varios(ids)
+            for id, tipo, offset, longitud in sorted(entradas, key=lambda e: e[2]):
+                if tipo not in tipos:
+                    continue
+                f.seek(offset)
+                datos = json.loads(f.read(longitud))
+                if tipo == "c":
+                    self.clientes[id] = Cliente.from_dict(datos)
+                else:
+                    self.prestamos[id] = Prestamo.from_dict(datos)
+        
+        if self.bitacora is not None:
+            self.recuperar(indice.lsn, ids, tipos)
+        return True
+    
+    def recuperar(self, lsn_instantanea: int = 0, ids: Optional[set] = None, tipos: str = "cp") -> int:
+        """Reproduce la bitácora sobre el estado actual; devuelve las operaciones aplicadas."""
+        aplicadas = 0
+        for registro in BitacoraEscritura.leer(self.bitacora.archivo):
+            # Registros anteriores a la instantánea ya están incluidos en ella
+            if registro["lsn"] <= lsn_instantanea:
+                continue
+            tipo, id = BitacoraEscritura.destino(registro)
+            if tipo in tipos and (ids is None or id in ids):
+                try:
+                    self._aplicar_registro(registro)
+                except KeyError as e:
+                    raise ValueError(
+                        f"La bitácora {self.bitacora.archivo} no corresponde a la instantánea: "
+                        f"el registro lsn {registro['lsn']} ({registro['op']}) referencia {e} inexistente"
+                    ) from e
+                aplicadas += 1
+        self.bitacora.lsn = max(self.bitacora.lsn, lsn_instantanea)
+        return aplicadas
 
 
 # Ejemplo de uso y pruebas
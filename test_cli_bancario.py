@@ -0,0 +1,143 @@
+import unittest
+from datetime import datetime, timedelta
+import io
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from contextlib import redirect_stdout, redirect_stderr
+from unittest import mock
+from core_bancario import CoreBancario, TipoPrestamo, IndiceRegistros
+import cli_bancario
+
+
+class TestCliBancario(unittest.TestCase):
+    def setUp(self):
+        self.directorio = tempfile.mkdtemp()
+        self.archivo = os.path.join(self.directorio, "datos.json")
+        
+        core = CoreBancario()
+        self.id_cliente = core.registrar_cliente("Test", "test@test.com", "123", 10000, 800)
+        self.id_prestamo = core.solicitar_prestamo(self.id_cliente, TipoPrestamo.PERSONAL, 1000, 12)
+        core.aprobar_prestamo(self.id_prestamo)
+        core.desembolsar_prestamo(self.id_prestamo)
+        for i in range(20):
+            otro = core.registrar_cliente(f"Cliente {i}", "c@test.com", "123", 10000, 700)
+            core.solicitar_prestamo(otro, TipoPrestamo.PERSONAL, 2000, 24)
+        core.guardar_datos(self.archivo)
+    
+    def tearDown(self):
+        shutil.rmtree(self.directorio)
+    
+    def ejecutar(self, *argumentos, archivo=None):
+        salida = io.StringIO()
+        with redirect_stdout(salida), redirect_stderr(io.StringIO()):
+            codigo = cli_bancario.main([archivo or self.archivo] + list(argumentos))
+        return codigo, salida.getvalue().strip()
+    
+    def test_indice_busca_registros(self):
+        with IndiceRegistros.abrir(self.archivo) as indice:
+            self.assertEqual(indice.cantidad, 42)
+            self.assertEqual(indice.buscar(self.id_prestamo)[1], "p")
+            self.assertEqual(indice.buscar(self.id_cliente)[1], "c")
+            self.assertIsNone(indice.buscar("inexistente"))
+    
+    def test_carga_parcial_no_permite_guardar(self):
+        core = CoreBancario()
+        self.assertTrue(core.cargar_registros(self.archivo, {self.id_cliente}))
+        self.assertEqual(list(core.clientes), [self.id_cliente])
+        with self.assertRaisesRegex(ValueError, "parcialmente"):
+            core.guardar_datos(self.archivo)
+        
+        core_completo = CoreBancario()
+        core_completo.cargar_datos(self.archivo)
+        self.assertEqual(len(core_completo.clientes), 21)
+    
+    def test_pagar_y_consultar_estado(self):
+        codigo, salida = self.ejecutar("pagar", self.id_prestamo, "250")
+        self.assertEqual(codigo, 0)
+        self.assertEqual(salida, "DESEMBOLSADO 750.00")
+        
+        codigo, salida = self.ejecutar("estado", self.id_prestamo)
+        self.assertEqual(salida, "DESEMBOLSADO 750.00")
+        
+        # Tras compactar, la carga completa también ve el pago registrado en la bitácora
+        self.assertEqual(self.ejecutar("compactar")[0], 0)
+        core = CoreBancario()
+        core.cargar_datos(self.archivo)
+        self.assertEqual(core.prestamos[self.id_prestamo].saldo, 750)
+    
+    def test_flujo_completo_y_moras(self):
+        _, id_cliente = self.ejecutar("registrar-cliente", "Ana", "ana@test.com", "1", "8000", "750")
+        codigo, id_prestamo = self.ejecutar("solicitar", id_cliente, "personal", "3000", "12")
+        self.assertEqual(codigo, 0)
+        self.assertEqual(self.ejecutar("aprobar", id_prestamo), (0, "APROBADO"))
+        self.assertEqual(self.ejecutar("desembolsar", id_prestamo), (0, "DESEMBOLSADO"))
+        self.assertEqual(self.ejecutar("desembolsar", id_prestamo)[0], 1)
+        
+        fecha = (datetime.now() - timedelta(days=45)).isoformat()
+        self.ejecutar("pagar", id_prestamo, "100", fecha)
+        self.assertEqual(self.ejecutar("moras"), (0, "1"))
+        self.assertEqual(self.ejecutar("estado", id_prestamo), (0, "EN_MORA 2900.00"))
+    
+    def test_reconstruye_indice_desactualizado(self):
+        os.remove(self.archivo + ".idx")
+        codigo, salida = self.ejecutar("estado", self.id_prestamo)
+        self.assertEqual((codigo, salida), (0, "DESEMBOLSADO 1000.00"))
+        with IndiceRegistros.abrir(self.archivo) as indice:
+            self.assertIsNotNone(indice.buscar(self.id_prestamo))
+    
+    def test_instantanea_corrupta_no_se_sobrescribe(self):
+        self.ejecutar("pagar", self.id_prestamo, "100")
+        with open(self.archivo, 'r+') as f:
+            f.truncate(300)
+        os.remove(self.archivo + ".idx")
+        with open(self.archivo, 'rb') as f:
+            instantanea = f.read()
+        with open(self.archivo + ".wal", 'rb') as f:
+            bitacora = f.read()
+        
+        self.assertEqual(self.ejecutar("moras")[0], 1)
+        with open(self.archivo, 'rb') as f:
+            self.assertEqual(f.read(), instantanea)
+        with open(self.archivo + ".wal", 'rb') as f:
+            self.assertEqual(f.read(), bitacora)
+    
+    def test_archivo_nuevo_solo_imprime_el_id(self):
+        archivo = os.path.join(self.directorio, "nuevo.json")
+        codigo, salida = self.ejecutar("registrar-cliente", "Ana", "a@test.com", "1", "8000", "750", archivo=archivo)
+        self.assertEqual(codigo, 0)
+        self.assertEqual(len(salida.splitlines()), 1)
+        self.assertEqual(self.ejecutar("solicitar", salida, "personal", "3000", "12", archivo=archivo)[0], 0)
+    
+    def test_compacta_al_superar_el_limite(self):
+        with mock.patch.object(cli_bancario, "LIMITE_BITACORA", 2):
+            for _ in range(3):
+                self.ejecutar("pagar", self.id_prestamo, "10")
+            self.assertGreater(os.path.getsize(self.archivo + ".wal"), 0)
+            self.assertEqual(self.ejecutar("estado", self.id_prestamo), (0, "DESEMBOLSADO 970.00"))
+        self.assertEqual(os.path.getsize(self.archivo + ".wal"), 0)
+    
+    def test_pagos_concurrentes(self):
+        script = os.path.join(os.path.dirname(os.path.abspath(cli_bancario.__file__)), "cli_bancario.py")
+        procesos = [subprocess.Popen([sys.executable, script, self.archivo, "pagar", self.id_prestamo, "10"],
+                                     stdout=subprocess.DEVNULL)
+                    for _ in range(10)]
+        self.assertEqual([p.wait() for p in procesos], [0] * 10)
+        self.assertEqual(self.ejecutar("estado", self.id_prestamo), (0, "DESEMBOLSADO 900.00"))
+    
+    def test_argumentos_invalidos(self):
+        self.assertEqual(self.ejecutar("pagar", self.id_prestamo, "abc")[0], 2)
+        self.assertEqual(self.ejecutar("pagar", self.id_prestamo, "nan")[0], 2)
+        self.assertEqual(self.ejecutar("pagar", self.id_prestamo)[0], 2)
+        self.assertEqual(self.ejecutar("pagar", self.id_prestamo, "10", "ayer")[0], 2)
+        self.assertEqual(self.ejecutar("solicitar", self.id_cliente, "yate", "1000", "12")[0], 2)
+        self.assertEqual(self.ejecutar("estado", self.id_prestamo), (0, "DESEMBOLSADO 1000.00"))
+    
+    def test_comando_invalido(self):
+        with redirect_stderr(io.StringIO()):
+            self.assertEqual(cli_bancario.main([self.archivo, "desconocido"]), 2)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,8 +1,13 @@
 import unittest
 from datetime import datetime, timedelta
-from core_bancario import CoreBancario, Cliente, Prestamo, Pago, EstadoPrestamo, TipoPrestamo
+from core_bancario import (CoreBancario, Cliente, Prestamo, Pago, EstadoPrestamo, TipoPrestamo,
+                           BitacoraEscritura, PoliticaSincronizacion)
 import uuid
 import os
+import shutil
+import tempfile
+import threading
+from unittest import mock
 
 
 class TestCoreBancario(unittest.TestCase):
@@ -151,8 +156,9 @@ class TestCoreBancario(unittest.TestCase):
         self.assertEqual(prestamo.monto, 10000.0)
         
         # Limpiar archivo de prueba
-        if os.path.exists(archivo):
-            os.remove(archivo)
+        for ruta in (archivo, archivo + ".idx"):
+            if os.path.exists(ruta):
+                os.remove(ruta)
     
     def test_calcular_cuota_mensual(self):
         prestamo = Prestamo(
@@ -227,5 +233,226 @@ class TestCoreBancarioAvanzado(unittest.TestCase):
         self.assertEqual(len(core.prestamos), 20)
 
 
+class TestBitacoraEscritura(unittest.TestCase):
+    def setUp(self):
+        self.directorio = tempfile.mkdtemp()
+        self.archivo_bitacora = os.path.join(self.directorio, "bitacora.wal")
+        self.archivo_datos = os.path.join(self.directorio, "datos.json")
+    
+    def tearDown(self):
+        shutil.rmtree(self.directorio)
+    
+    def _crear_prestamo_desembolsado(self, core):
+        id_cliente = core.registrar_cliente("Test", "test@test.com", "123", 10000, 800)
+        id_prestamo = core.solicitar_prestamo(id_cliente, TipoPrestamo.PERSONAL, 1000, 12)
+        core.aprobar_prestamo(id_prestamo)
+        core.desembolsar_prestamo(id_prestamo)
+        return id_cliente, id_prestamo
+    
+    def test_recuperar_sin_instantanea(self):
+        bitacora = BitacoraEscritura(self.archivo_bitacora, PoliticaSincronizacion.POR_OPERACION)
+        core = CoreBancario(bitacora)
+        id_cliente, id_prestamo = self._crear_prestamo_desembolsado(core)
+        core.registrar_pago(id_prestamo, 300, datetime.now())
+        bitacora.cerrar()  # Simula caída: nunca se llamó a guardar_datos
+        
+        core_recuperado = CoreBancario(BitacoraEscritura(self.archivo_bitacora))
+        core_recuperado.cargar_datos(self.archivo_datos)
+        core_recuperado.bitacora.cerrar()
+        
+        self.assertIn(id_cliente, core_recuperado.clientes)
+        prestamo = core_recuperado.prestamos[id_prestamo]
+        self.assertEqual(prestamo.estado, EstadoPrestamo.DESEMBOLSADO)
+        self.assertEqual(prestamo.saldo, 700)
+        self.assertEqual(prestamo.pagos[0].id_pago, core.prestamos[id_prestamo].pagos[0].id_pago)
+    
+    def test_punto_de_control_no_duplica_pagos(self):
+        bitacora = BitacoraEscritura(self.archivo_bitacora, PoliticaSincronizacion.SISTEMA)
+        core = CoreBancario(bitacora)
+        _, id_prestamo = self._crear_prestamo_desembolsado(core)
+        core.registrar_pago(id_prestamo, 100, datetime.now())
+        core.guardar_datos(self.archivo_datos)
+        self.assertEqual(list(BitacoraEscritura.leer(self.archivo_bitacora)), [])
+        
+        core.registrar_pago(id_prestamo, 200, datetime.now())
+        bitacora.cerrar()
+        
+        core_recuperado = CoreBancario(BitacoraEscritura(self.archivo_bitacora))
+        core_recuperado.cargar_datos(self.archivo_datos)
+        core_recuperado.bitacora.cerrar()
+        
+        prestamo = core_recuperado.prestamos[id_prestamo]
+        self.assertEqual(prestamo.saldo, 700)
+        self.assertEqual(len(prestamo.pagos), 2)
+    
+    def test_pagos_concurrentes_no_sobrepagan(self):
+        bitacora = BitacoraEscritura(self.archivo_bitacora, PoliticaSincronizacion.GRUPO)
+        core = CoreBancario(bitacora)
+        id_cliente = core.registrar_cliente("Test", "test@test.com", "123", 10000, 800)
+        id_prestamo = core.solicitar_prestamo(id_cliente, TipoPrestamo.PERSONAL, 300, 12)
+        core.aprobar_prestamo(id_prestamo)
+        core.desembolsar_prestamo(id_prestamo)
+        
+        def pagar():
+            while core.registrar_pago(id_prestamo, 1, datetime.now()):
+                pass
+        hilos = [threading.Thread(target=pagar) for _ in range(8)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        bitacora.cerrar()
+        
+        prestamo = core.prestamos[id_prestamo]
+        self.assertEqual(prestamo.saldo, 0)
+        self.assertEqual(len(prestamo.pagos), 300)
+        self.assertEqual(prestamo.estado, EstadoPrestamo.PAGADO)
+        
+        # La bitácora refleja exactamente el mismo orden de pagos que la memoria
+        pagos_bitacora = [r["pago"]["id_pago"] for r in BitacoraEscritura.leer(self.archivo_bitacora)
+                          if r["op"] == "pago"]
+        self.assertEqual(pagos_bitacora, [p.id_pago for p in prestamo.pagos])
+    
+    def test_punto_de_control_sincroniza_directorio_antes_de_truncar(self):
+        bitacora = BitacoraEscritura(self.archivo_bitacora, PoliticaSincronizacion.POR_OPERACION)
+        core = CoreBancario(bitacora)
+        self._crear_prestamo_desembolsado(core)
+        
+        eventos = mock.Mock()
+        eventos.truncar.side_effect = bitacora.truncar
+        with mock.patch("core_bancario._sincronizar_directorio", eventos.sincronizar_directorio), \
+                mock.patch.object(bitacora, "truncar", eventos.truncar):
+            core.guardar_datos(self.archivo_datos)
+        bitacora.cerrar()
+        
+        self.assertEqual(eventos.mock_calls, [mock.call.sincronizar_directorio(self.archivo_datos),
+                                              mock.call.truncar()])
+    
+    def test_bitacora_sin_instantanea_correspondiente(self):
+        bitacora = BitacoraEscritura(self.archivo_bitacora, PoliticaSincronizacion.POR_OPERACION)
+        core = CoreBancario(bitacora)
+        _, id_prestamo = self._crear_prestamo_desembolsado(core)
+        core.guardar_datos(self.archivo_datos)
+        core.registrar_pago(id_prestamo, 100, datetime.now())
+        bitacora.cerrar()
+        os.rename(self.archivo_datos, self.archivo_datos + ".perdido")
+        
+        core_recuperado = CoreBancario(BitacoraEscritura(self.archivo_bitacora))
+        with self.assertRaisesRegex(ValueError, "no corresponde a la instantánea"):
+            core_recuperado.cargar_datos(self.archivo_datos)
+        core_recuperado.bitacora.cerrar()
+        self.assertEqual(core_recuperado.prestamos, {})
+    
+    def test_instantanea_corrupta_no_reproduce_bitacora(self):
+        bitacora = BitacoraEscritura(self.archivo_bitacora, PoliticaSincronizacion.POR_OPERACION)
+        core = CoreBancario(bitacora)
+        _, id_prestamo = self._crear_prestamo_desembolsado(core)
+        core.guardar_datos(self.archivo_datos)
+        core.registrar_pago(id_prestamo, 100, datetime.now())
+        bitacora.cerrar()
+        with open(self.archivo_datos, 'r+') as f:
+            f.truncate(40)
+        
+        with open(self.archivo_datos, 'rb') as f:
+            instantanea = f.read()
+        with open(self.archivo_bitacora, 'rb') as f:
+            contenido_bitacora = f.read()
+        
+        core_recuperado = CoreBancario(BitacoraEscritura(self.archivo_bitacora))
+        with self.assertRaisesRegex(ValueError, "Error al cargar datos"):
+            core_recuperado.cargar_datos(self.archivo_datos)
+        self.assertEqual(core_recuperado.prestamos, {})
+        
+        # Guardar el core vacío borraría el pago que solo existe en la bitácora
+        with self.assertRaisesRegex(ValueError, "No se puede guardar"):
+            core_recuperado.guardar_datos(self.archivo_datos)
+        core_recuperado.bitacora.cerrar()
+        with open(self.archivo_datos, 'rb') as f:
+            self.assertEqual(f.read(), instantanea)
+        with open(self.archivo_bitacora, 'rb') as f:
+            self.assertEqual(f.read(), contenido_bitacora)
+    
+    def test_instantanea_corrupta_sin_bitacora_mantiene_comportamiento(self):
+        with open(self.archivo_datos, 'w') as f:
+            f.write('{"clientes": ')
+        core = CoreBancario()
+        self.assertFalse(core.cargar_datos(self.archivo_datos))
+    
+    def test_bloqueo_con_msvcrt_en_windows(self):
+        msvcrt = mock.Mock(LK_LOCK=1, LK_UNLCK=0)
+        with mock.patch("core_bancario.fcntl", None), mock.patch("core_bancario.msvcrt", msvcrt):
+            bitacora = BitacoraEscritura(self.archivo_bitacora, PoliticaSincronizacion.POR_OPERACION)
+            fd = bitacora._bloqueo.fileno()
+            msvcrt.locking.assert_called_once_with(fd, msvcrt.LK_LOCK, 1)
+            bitacora.cerrar()
+        msvcrt.locking.assert_called_with(fd, msvcrt.LK_UNLCK, 1)
+    
+    def test_sin_bloqueo_disponible_no_abre_la_bitacora(self):
+        with mock.patch("core_bancario.fcntl", None), mock.patch("core_bancario.msvcrt", None):
+            with self.assertRaisesRegex(OSError, "bloqueo"):
+                BitacoraEscritura(self.archivo_bitacora)
+        self.assertFalse(os.path.exists(self.archivo_bitacora))
+    
+    def test_descarta_registro_incompleto(self):
+        bitacora = BitacoraEscritura(self.archivo_bitacora, PoliticaSincronizacion.POR_OPERACION)
+        core = CoreBancario(bitacora)
+        _, id_prestamo = self._crear_prestamo_desembolsado(core)
+        core.registrar_pago(id_prestamo, 100, datetime.now())
+        bitacora.cerrar()
+        
+        # Caída a mitad de escritura del último registro
+        with open(self.archivo_bitacora, 'ab') as f:
+            f.write(b'0badc0de {"lsn": 99, "op": "pa')
+        
+        bitacora = BitacoraEscritura(self.archivo_bitacora, PoliticaSincronizacion.POR_OPERACION)
+        self.assertEqual(bitacora.lsn, 5)
+        core_recuperado = CoreBancario(bitacora)
+        core_recuperado.cargar_datos(self.archivo_datos)
+        core_recuperado.registrar_pago(id_prestamo, 50, datetime.now())
+        bitacora.cerrar()
+        
+        registros = list(BitacoraEscritura.leer(self.archivo_bitacora))
+        self.assertEqual([r["lsn"] for r in registros], [1, 2, 3, 4, 5, 6])
+    
+    def test_commit_agrupado_es_durable_al_retornar(self):
+        bitacora = BitacoraEscritura(self.archivo_bitacora, PoliticaSincronizacion.GRUPO)
+        core = CoreBancario(bitacora)
+        _, id_prestamo = self._crear_prestamo_desembolsado(core)
+        
+        # Tamaño del archivo en cada fsync: el pago debe estar cubierto antes de retornar
+        tamanos_sincronizados = []
+        fsync_original = os.fsync
+        def fsync_registrado(fd):
+            fsync_original(fd)
+            tamanos_sincronizados.append(os.fstat(fd).st_size)
+        
+        with mock.patch("core_bancario.os.fsync", fsync_registrado):
+            self.assertTrue(core.registrar_pago(id_prestamo, 1, datetime.now()))
+            tamano_tras_pago = os.path.getsize(self.archivo_bitacora)
+        
+        self.assertEqual(tamanos_sincronizados, [tamano_tras_pago])
+        bitacora.cerrar()
+    
+    def test_commit_agrupado_comparte_fsync_entre_hilos(self):
+        bitacora = BitacoraEscritura(self.archivo_bitacora, PoliticaSincronizacion.GRUPO, intervalo_ms=1)
+        core = CoreBancario(bitacora)
+        _, id_prestamo = self._crear_prestamo_desembolsado(core)
+        
+        with mock.patch("core_bancario.os.fsync", wraps=os.fsync) as fsync:
+            hilos = [threading.Thread(target=lambda: [bitacora.registrar("mora", id_prestamo=id_prestamo)
+                                                      for _ in range(25)])
+                     for _ in range(8)]
+            for hilo in hilos:
+                hilo.start()
+            for hilo in hilos:
+                hilo.join()
+        
+        self.assertLess(fsync.call_count, 200)
+        self.assertEqual(bitacora._lsn_durable, bitacora.lsn)
+        bitacora.cerrar()
+        
+        registros = list(BitacoraEscritura.leer(self.archivo_bitacora))
+        self.assertEqual([r["lsn"] for r in registros], list(range(1, 205)))
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
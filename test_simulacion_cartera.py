@@ -0,0 +1,75 @@
+import unittest
+from datetime import timedelta
+import numpy as np
+from core_bancario import CoreBancario, TipoPrestamo
+from simulacion_cartera import Escenario, TrayectoriasEscenario, Cartera, proyectar
+
+
+class TestSimulacionCartera(unittest.TestCase):
+    def setUp(self):
+        self.core = CoreBancario()
+        id_cliente = self.core.registrar_cliente("Test", "test@test.com", "123", 10000, 800)
+        self.id_prestamo = self.core.solicitar_prestamo(id_cliente, TipoPrestamo.PERSONAL, 10000, 24)
+        self.core.aprobar_prestamo(self.id_prestamo)
+        self.core.desembolsar_prestamo(self.id_prestamo)
+        # Préstamo solo solicitado: no forma parte de la cartera activa
+        self.core.solicitar_prestamo(id_cliente, TipoPrestamo.PERSONAL, 5000, 12)
+        
+        generador = np.random.default_rng(7)
+        self.cartera = Cartera(
+            generador.uniform(1000, 50000, 500),
+            generador.choice([8.5, 12.0, 15.5, 20.0], 500),
+            generador.integers(1, 61, 500),
+            generador.random(500) < 0.1,
+        )
+        self.trayectorias = TrayectoriasEscenario.monte_carlo(
+            Escenario("mc", tasa_prepago=0.08, tasa_default=0.03), 20, meses=60, semilla=3)
+    
+    def test_cartera_desde_core(self):
+        cartera = Cartera.desde_core(self.core)
+        self.assertEqual(cartera.ids, [self.id_prestamo])
+        self.assertEqual(cartera.plazo_restante[0], 24)
+    
+    def test_desembolso_posterior_no_alarga_el_plazo(self):
+        fecha = self.core.prestamos[self.id_prestamo].fecha_desembolso - timedelta(days=90)
+        cartera = Cartera.desde_core(self.core, fecha)
+        self.assertEqual(cartera.plazo_restante[0], 24)
+    
+    def test_sin_prepago_ni_default_coincide_con_cuota(self):
+        cartera = Cartera.desde_core(self.core)
+        trayectorias = TrayectoriasEscenario.deterministas([Escenario("base")], meses=24)
+        resultado = proyectar(cartera, trayectorias)
+        
+        cuota = self.core.prestamos[self.id_prestamo].calcular_cuota_mensual()
+        self.assertAlmostEqual(resultado.interes[0].sum(), cuota * 24 - 10000, delta=0.2)
+        self.assertAlmostEqual(resultado.principal[0].sum(), 10000, places=6)
+        self.assertAlmostEqual(resultado.saldo[0, -1], 0, places=6)
+    
+    def test_escenario_estres_aumenta_perdidas(self):
+        trayectorias = TrayectoriasEscenario.deterministas([
+            Escenario("base", tasa_prepago=0.05, tasa_default=0.02),
+            Escenario("estres", tasa_prepago=0.02, tasa_default=0.10, severidad=0.6, desplazamiento_tasa=3.0),
+        ], meses=60)
+        resumen = proyectar(self.cartera, trayectorias).resumen()
+        self.assertGreater(resumen["estres"]["perdidas_totales"], resumen["base"]["perdidas_totales"])
+        self.assertGreater(resumen["estres"]["interes_total"], 0)
+    
+    def test_agrupar_no_cambia_resultados(self):
+        agrupado = proyectar(self.cartera, self.trayectorias)
+        individual = proyectar(self.cartera, self.trayectorias, agrupar=False, tamano_bloque=128)
+        for campo in agrupado.CAMPOS:
+            np.testing.assert_allclose(getattr(agrupado, campo), getattr(individual, campo), rtol=1e-9, atol=1e-6)
+    
+    def test_pool_de_procesos(self):
+        secuencial = proyectar(self.cartera, self.trayectorias, agrupar=False, tamano_bloque=100)
+        paralelo = proyectar(self.cartera, self.trayectorias, agrupar=False, tamano_bloque=100, procesos=2)
+        np.testing.assert_allclose(secuencial.saldo, paralelo.saldo, rtol=1e-12)
+    
+    def test_cartera_vacia(self):
+        resultado = proyectar(Cartera.desde_core(CoreBancario()), self.trayectorias)
+        self.assertEqual(resultado.saldo.shape, (20, 60))
+        self.assertEqual(resultado.saldo.sum(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()